@@ -26,10 +26,7 @@ from matplotlib.ticker import PercentFormatter
 from matplotlib import ticker
 
 from src import (
-    compute_TIR,
-    compute_TBR,
-    compute_TAR,
-    compute_GMI,
+    compute_all_metrics,
     compute_summary_metrics,
     local_variance_mask,
     jump_spike_mask,
@@ -77,10 +74,7 @@ def main():
     # 2. Glycemic metrics (unmasked)
     glucose = cgm_py["egv"]
     raw = {
-        "TIR": compute_TIR(glucose),
-        "TBR": compute_TBR(glucose),
-        "TAR": compute_TAR(glucose),
-        "GMI": compute_GMI(glucose),
+        **compute_all_metrics(glucose),
         "summary": compute_summary_metrics(glucose),
     }
     def round_summary(d):
@@ -113,32 +107,25 @@ def main():
         raise SystemExit("Calibration table needs a timestamp column (ts, Timestamp, or Time)")
     m_calibration = calibration_period_mask(glucose_arr, cgm_py["ts"], cal_ts, prior_hr=1, post_min=30)
 
-    def pad_mask(mask, size):
-        if mask is None or size <= 0:
-            return None
-        m = np.asarray(mask, dtype=bool)
-        return np.resize(m, size) if len(m) < size else m[:size]
-
-    combined = pad_mask(m1, n) | pad_mask(m2, n) | pad_mask(m3, n) | pad_mask(m4, n) | pad_mask(m5, n) | pad_mask(m6, n) | pad_mask(m_warmup_tail, n) | pad_mask(m_calibration, n)
+    # every mask returns one flag per reading, so they combine without alignment
+    combined = m1 | m2 | m3 | m4 | m5 | m6 | m_warmup_tail | m_calibration
     scenarios = [
         ("Unmasked", None),
-        ("Variance", pad_mask(m1, n)),
-        ("Jump spike", pad_mask(m2, n)),
-        ("Jitter", pad_mask(m3, n)),
-        ("Drift", pad_mask(m4, n)),
-        ("Flatline", pad_mask(m5, n)),
-        ("Long NaN", pad_mask(m6, n)),
-        ("Warmup/tail", pad_mask(m_warmup_tail, n)),
-        ("Calibration", pad_mask(m_calibration, n)),
-        ("Combined", pad_mask(combined, n)),
+        ("Variance", m1),
+        ("Jump spike", m2),
+        ("Jitter", m3),
+        ("Drift", m4),
+        ("Flatline", m5),
+        ("Long NaN", m6),
+        ("Warmup/tail", m_warmup_tail),
+        ("Calibration", m_calibration),
+        ("Combined", combined),
     ]
     rows = []
     for name, mask in scenarios:
-        pct = 0.0 if mask is None else (100.0 * np.sum(mask) / n)
-        tir = compute_TIR(glucose_arr, mask=mask)
-        tbr = compute_TBR(glucose_arr, mask=mask)
-        tar = compute_TAR(glucose_arr, mask=mask)
-        gmi = compute_GMI(glucose_arr, mask=mask)
+        pct = 0.0 if mask is None else (100.0 * np.count_nonzero(mask) / n)
+        glycemic = compute_all_metrics(glucose_arr, mask=mask)
+        tir, tbr, tar, gmi = (glycemic[k] for k in ("TIR", "TBR", "TAR", "GMI"))
         sm = compute_summary_metrics(glucose_arr, mask=mask)
         rows.append({
             "Scenario": name,
@@ -13,8 +13,16 @@ from .instability import (
     session_warmup_tail_mask,
     calibration_period_mask,
     instability_mask,
+    instability_mask_batch,
+)
+from .metrics import (
+    compute_TIR,
+    compute_TBR,
+    compute_TAR,
+    compute_GMI,
+    compute_all_metrics,
+    compute_summary_metrics,
 )
-from .metrics import compute_TIR, compute_TBR, compute_TAR, compute_GMI, compute_summary_metrics
 from .session import max_session_days
 
 __all__ = [
@@ -27,10 +35,12 @@ __all__ = [
     "session_warmup_tail_mask",
     "calibration_period_mask",
     "instability_mask",
+    "instability_mask_batch",
     "compute_TIR",
     "compute_TBR",
     "compute_TAR",
     "compute_GMI",
+    "compute_all_metrics",
     "compute_summary_metrics",
     "max_session_days",
 ]
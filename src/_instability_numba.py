@@ -0,0 +1,376 @@
+"""
+Numba kernels for the rolling instability heuristics (optional acceleration).
+Importing this module raises ImportError when numba is not installed; instability.py
+then falls back to its NumPy implementations. Each kernel takes a 1D float array
+(float32 or float64, see instability._compact) and returns the same values as the
+NumPy path; running variance sums are float64 regardless of input dtype. Rolling variances are
+identical on integer readings and agree to rounding otherwise, with windows of one
+finite or k identical readings exactly 0 in every implementation.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+# Full fastmath assumes no NaN/inf and would drop the finiteness checks below.
+_FASTMATH = {"nsz", "arcp", "contract", "reassoc"}
+_VAR_CHUNK = 4096
+
+
+@njit(cache=True, inline="always")
+def _finite(v):
+    return v - v == 0.0
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _fill_windows(edge, k):
+    """out[j] is True iff any edge[j : j + k] is True (window ending at the edge)."""
+    n = edge.size
+    out = np.zeros(n, dtype=np.bool_)
+    left = 0
+    for j in range(n - 1, -1, -1):
+        if edge[j]:
+            left = k
+        if left > 0:
+            out[j] = True
+            left -= 1
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH, parallel=True)
+def _rolling_variance(arr, k):
+    """
+    Population variance of finite values per length-k window ending at i; NaN if none.
+    As in instability._rolling_nanvar, a window of k identical readings (run of k - 1
+    zero diffs) is exactly 0 rather than the running sums' rounding residue.
+    """
+    n = arr.size
+    var = np.full(n, np.nan)
+    total = 0.0
+    count = 0
+    for i in range(n):
+        v = arr[i]
+        if _finite(v):
+            total += v
+            count += 1
+    if count == 0 or n < k:
+        return var
+    # shift by a whole number so integer mg/dL readings keep exact running sums
+    shift = np.round(total / count)
+    n_chunks = (n - k + _VAR_CHUNK) // _VAR_CHUNK
+    # chunks are independent: each one re-primes its sums over the k points before
+    # start (k - 1 for the first chunk), so arr[start - k] is in the sums when the
+    # slide below removes it at i == start
+    for c in prange(n_chunks):
+        start = k - 1 + c * _VAR_CHUNK
+        stop = min(start + _VAR_CHUNK, n)
+        s = 0.0
+        s2 = 0.0
+        cnt = 0
+        run = 0
+        for j in range(max(start - k, 0), start):
+            v = arr[j]
+            if _finite(v):
+                x = v - shift
+                s += x
+                s2 += x * x
+                cnt += 1
+            if j >= 1:
+                run = run + 1 if v - arr[j - 1] == 0.0 else 0
+        for i in range(start, stop):
+            v = arr[i]
+            if _finite(v):
+                x = v - shift
+                s += x
+                s2 += x * x
+                cnt += 1
+            if i >= 1:
+                run = run + 1 if v - arr[i - 1] == 0.0 else 0
+            if i >= k:
+                v = arr[i - k]
+                if _finite(v):
+                    x = v - shift
+                    s -= x
+                    s2 -= x * x
+                    cnt -= 1
+            if k > 1 and run >= k - 1:
+                var[i] = 0.0
+            elif cnt > 0:
+                var[i] = max((cnt * s2 - s * s) / (cnt * cnt), 0.0)
+    return var
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _monotonic_drift(arr, k):
+    """Windows of k finite points whose diffs never fall or never rise."""
+    n = arr.size
+    edge = np.zeros(n, dtype=np.bool_)
+    n_up = 0
+    n_down = 0
+    n_bad = 0
+    for i in range(n):
+        if not _finite(arr[i]):
+            n_bad += 1
+        if i >= k and not _finite(arr[i - k]):
+            n_bad -= 1
+        if i >= 1:
+            d = arr[i] - arr[i - 1]
+            if d > 0:
+                n_up += 1
+            elif d < 0:
+                n_down += 1
+        if i >= k:
+            d = arr[i - k + 1] - arr[i - k]
+            if d > 0:
+                n_up -= 1
+            elif d < 0:
+                n_down -= 1
+        if i >= k - 1 and n_bad == 0 and (n_up == 0 or n_down == 0):
+            edge[i] = True
+    return _fill_windows(edge, k)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _flatline(arr, k):
+    """Runs of at least k identical finite readings."""
+    n = arr.size
+    edge = np.zeros(n, dtype=np.bool_)
+    run = 0
+    for i in range(1, n):
+        if arr[i] - arr[i - 1] == 0.0:
+            run += 1
+        else:
+            run = 0
+        if run >= k - 1:
+            edge[i] = True
+    return _fill_windows(edge, k)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _jitter(arr, k, min_sign_changes):
+    """Windows of k finite points with at least min_sign_changes direction reversals."""
+    n = arr.size
+    edge = np.zeros(n, dtype=np.bool_)
+    n_bad = 0
+    n_sc = 0
+    for i in range(n):
+        if not _finite(arr[i]):
+            n_bad += 1
+        if i >= k and not _finite(arr[i - k]):
+            n_bad -= 1
+        # reversal at the pair of diffs ending at i; window ending at i holds k - 2 of them
+        if i >= 2 and (arr[i] - arr[i - 1]) * (arr[i - 1] - arr[i - 2]) < 0:
+            n_sc += 1
+        j = i - k + 2
+        if j >= 2 and (arr[j] - arr[j - 1]) * (arr[j - 1] - arr[j - 2]) < 0:
+            n_sc -= 1
+        if i >= k - 1 and n_bad == 0 and n_sc >= min_sign_changes:
+            edge[i] = True
+    return _fill_windows(edge, k)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _long_nan_run(arr, k_dropout, k_prior):
+    """Non-finite runs of at least k_dropout points plus the k_prior points before each."""
+    n = arr.size
+    out = np.zeros(n, dtype=np.bool_)
+    run_start = -1
+    for i in range(n + 1):
+        if i < n and not _finite(arr[i]):
+            if run_start < 0:
+                run_start = i
+        elif run_start >= 0:
+            if i - run_start >= k_dropout:
+                for j in range(max(0, run_start - k_prior), i):
+                    out[j] = True
+            run_start = -1
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _instability_fused(
+    arr,
+    k_var,
+    jump_threshold,
+    k_jitter,
+    min_sign_changes,
+    k_drift,
+    low_threshold,
+    k_low,
+    k_flat,
+    k_dropout,
+    k_prior,
+):
+    """
+    All instability heuristics in one pass over arr. Returns (flags, var): flags ORs
+    jump, jitter, drift, low run, flatline, dropout and long NaN run; var is the
+    rolling variance, left to the caller because its default threshold is a
+    percentile over the whole series.
+
+    Window heuristics fill [i - k + 1, i] on a hit but skip indices an earlier hit
+    of the same heuristic already wrote, so each index is written at most once.
+    """
+    n = arr.size
+    out = np.zeros(n, dtype=np.bool_)
+    var = np.full(n, np.nan)
+
+    total = 0.0
+    count = 0
+    for i in range(n):
+        if _finite(arr[i]):
+            total += arr[i]
+            count += 1
+    shift = np.round(total / count) if count > 0 else 0.0
+
+    s = 0.0
+    s2 = 0.0
+    cnt = 0
+    jit_bad = 0
+    n_sc = 0
+    jit_to = -1
+    drift_bad = 0
+    n_up = 0
+    n_down = 0
+    drift_to = -1
+    flat_run = 0
+    flat_to = -1
+    low_start = -1
+    nan_start = -1
+
+    for i in range(n):
+        v = arr[i]
+        fin = _finite(v)
+
+        # dropout: every non-finite reading
+        if not fin:
+            out[i] = True
+
+        # run of zero diffs ending at i, shared by variance and flatline
+        if i >= 1 and v - arr[i - 1] == 0.0:
+            flat_run += 1
+        else:
+            flat_run = 0
+
+        # rolling variance over k_var; flat windows are exactly 0, as in _rolling_variance
+        if fin:
+            x = v - shift
+            s += x
+            s2 += x * x
+            cnt += 1
+        if i >= k_var and _finite(arr[i - k_var]):
+            x = arr[i - k_var] - shift
+            s -= x
+            s2 -= x * x
+            cnt -= 1
+        if i >= k_var - 1 and k_var > 1 and flat_run >= k_var - 1:
+            var[i] = 0.0
+        elif i >= k_var - 1 and cnt > 0:
+            var[i] = max((cnt * s2 - s * s) / (cnt * cnt), 0.0)
+
+        # jump / spike
+        if i >= 1 and abs(v - arr[i - 1]) > jump_threshold:
+            out[i] = True
+
+        # jitter
+        if not fin:
+            jit_bad += 1
+        if i >= k_jitter and not _finite(arr[i - k_jitter]):
+            jit_bad -= 1
+        if i >= 2 and (v - arr[i - 1]) * (arr[i - 1] - arr[i - 2]) < 0:
+            n_sc += 1
+        j = i - k_jitter + 2
+        if j >= 2 and (arr[j] - arr[j - 1]) * (arr[j - 1] - arr[j - 2]) < 0:
+            n_sc -= 1
+        if i >= k_jitter - 1 and jit_bad == 0 and n_sc >= min_sign_changes:
+            out[max(i - k_jitter + 1, jit_to + 1) : i + 1] = True
+            jit_to = i
+
+        # monotonic drift
+        if not fin:
+            drift_bad += 1
+        if i >= k_drift and not _finite(arr[i - k_drift]):
+            drift_bad -= 1
+        if i >= 1:
+            d = v - arr[i - 1]
+            if d > 0:
+                n_up += 1
+            elif d < 0:
+                n_down += 1
+        if i >= k_drift:
+            d = arr[i - k_drift + 1] - arr[i - k_drift]
+            if d > 0:
+                n_up -= 1
+            elif d < 0:
+                n_down -= 1
+        if i >= k_drift - 1 and drift_bad == 0 and (n_up == 0 or n_down == 0):
+            out[max(i - k_drift + 1, drift_to + 1) : i + 1] = True
+            drift_to = i
+
+        # below low_threshold for more than k_low points
+        if fin and v < low_threshold:
+            if low_start < 0:
+                low_start = i
+            run_len = i - low_start + 1
+            if run_len == k_low + 1:
+                out[low_start : i + 1] = True
+            elif run_len > k_low + 1:
+                out[i] = True
+        else:
+            low_start = -1
+
+        # flatline
+        if flat_run >= k_flat - 1 and i >= 1:
+            out[max(i - k_flat + 1, flat_to + 1) : i + 1] = True
+            flat_to = i
+
+        # long NaN run plus the k_prior points before it
+        if not fin:
+            if nan_start < 0:
+                nan_start = i
+            run_len = i - nan_start + 1
+            if run_len == k_dropout:
+                out[max(0, nan_start - k_prior) : i + 1] = True
+            elif run_len > k_dropout:
+                out[i] = True
+        else:
+            nan_start = -1
+
+    return out, var
+
+
+@njit(cache=True, parallel=True)
+def _instability_fused_batch(
+    arr2d,
+    lengths,
+    k_var,
+    jump_threshold,
+    k_jitter,
+    min_sign_changes,
+    k_drift,
+    low_threshold,
+    k_low,
+    k_flat,
+    k_dropout,
+    k_prior,
+):
+    """_instability_fused over the first lengths[r] values of each row, rows in parallel."""
+    n_rows, width = arr2d.shape
+    out = np.zeros((n_rows, width), dtype=np.bool_)
+    var = np.full((n_rows, width), np.nan)
+    for r in prange(n_rows):
+        m = lengths[r]
+        flags, v = _instability_fused(
+            arr2d[r, :m],
+            k_var,
+            jump_threshold,
+            k_jitter,
+            min_sign_changes,
+            k_drift,
+            low_threshold,
+            k_low,
+            k_flat,
+            k_dropout,
+            k_prior,
+        )
+        out[r, :m] = flags
+        var[r, :m] = v
+    return out, var
@@ -1,12 +1,6 @@
 import pandas as pd
 
-from .metrics import (
-    compute_TIR,
-    compute_TBR,
-    compute_TAR,
-    compute_GMI,
-    compute_summary_metrics,
-)
+from .metrics import compute_all_metrics, compute_summary_metrics
 
 
 def _metrics_for_group(group: pd.DataFrame) -> pd.Series:
@@ -16,6 +10,7 @@ def _metrics_for_group(group: pd.DataFrame) -> pd.Series:
     """
     glucose = group["egv"]
     summary = compute_summary_metrics(glucose)
+    glycemic = compute_all_metrics(glucose)
     return pd.Series(
         {
             "n_points": int(glucose.shape[0]),
@@ -25,10 +20,10 @@ def _metrics_for_group(group: pd.DataFrame) -> pd.Series:
             "median": summary["median"],
             "min": summary["min"],
             "max": summary["max"],
-            "TIR": compute_TIR(glucose),
-            "TBR": compute_TBR(glucose),
-            "TAR": compute_TAR(glucose),
-            "GMI": compute_GMI(glucose),
+            "TIR": glycemic["TIR"],
+            "TBR": glycemic["TBR"],
+            "TAR": glycemic["TAR"],
+            "GMI": glycemic["GMI"],
         }
     )
 
@@ -10,20 +10,136 @@ import pandas as pd
 
 from .metrics import _normalize_glucose
 
+try:
+    from . import _instability_numba as _numba
+except ImportError:  # numba not installed: NumPy paths below
+    _numba = None
+
+
+def _compact(arr):
+    """
+    arr as float32 when that cast is lossless (e.g. integer mg/dL readings), halving the
+    bytes each mask pass reads; otherwise float64, so equality and threshold comparisons
+    on non-integer readings (mmol/L, calibrated values) match the float64 results.
+    """
+    arr32 = arr.astype(np.float32)
+    if arr.dtype == np.float32 or np.array_equal(arr32, arr, equal_nan=True):
+        return arr32
+    return arr.astype(np.float64, copy=False)
+
 
 def _as_array(series):
-    """Extract 1D float array from Series or array; normalize 'Low' like metrics."""
+    """
+    Extract 1D float array from Series or array (see _compact for the dtype);
+    normalize 'Low' like metrics. Variance accumulates in float64 either way.
+    """
     series = _normalize_glucose(series)
-    arr = np.asarray(series, dtype=float)
+    arr = np.asarray(series, dtype=np.float64)
     if arr.ndim != 1:
         raise ValueError("Expected 1D glucose series")
-    return arr
+    return _compact(arr)
+
+
+def _finite_mask(arr, finite=None):
+    """np.isfinite(arr), or the precomputed copy instability_mask shares across masks."""
+    return np.isfinite(arr) if finite is None else finite
+
+
+def _diff(arr, diff=None):
+    """np.diff(arr), or the precomputed copy instability_mask shares across masks."""
+    return np.diff(arr) if diff is None else diff
+
+
+def _window_sums(x, k):
+    """Sum of x over each length-k window ending at i (i >= k - 1), via cumsum difference."""
+    c = np.concatenate(([0], np.cumsum(x)))
+    return c[k:] - c[:-k]
+
+
+def _fill_windows(edge, k):
+    """
+    Mark every length-k window whose right edge is True: out[j] is True iff any
+    edge[j : j + k] is True. O(n) for any k via a cumulative count of edges.
+    """
+    n = edge.size
+    c = np.concatenate(([0], np.cumsum(edge)))
+    hi = np.minimum(np.arange(n) + k, n)
+    return (c[hi] - c[:n]) > 0
+
+
+def _runs(flags):
+    """Start and end (exclusive) indices of each run of True in a 1D bool array."""
+    edges = np.diff(flags.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _mark_spans(n, starts, ends):
+    """Length-n mask, True on every [start, end) span (spans may overlap)."""
+    delta = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(delta, starts, 1)
+    np.add.at(delta, ends, -1)
+    return np.cumsum(delta[:n]) > 0
 
 
-def local_variance_mask(glucose, window_min=30, interval_min=5, threshold=None):
+def _rolling_nanvar(arr, k, finite=None, diff=None):
+    """
+    Population variance of finite values in each length-k window ending at i; NaN
+    before k - 1 and where a window has no finite value. O(n) running sums of x and x².
+    """
+    n = arr.size
+    finite = _finite_mask(arr, finite)
+    # k - 1 zero diffs mean k identical finite readings: exactly 0, which running
+    # sums of non-integer readings (e.g. 5.6) only reach to within rounding
+    flat = _window_sums(_diff(arr, diff) == 0, k - 1) == k - 1 if k > 1 else None
+    arr = arr.astype(np.float64, copy=False)
+    var = np.full(n, np.nan)
+    if not np.any(finite):
+        return var
+    # shift by a whole number so integer mg/dL readings keep exact running sums
+    x = np.where(finite, arr - np.round(np.mean(arr[finite])), 0.0)
+    s = _window_sums(x, k)
+    s2 = _window_sums(x * x, k)
+    c = _window_sums(finite, k)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        v = np.maximum((c * s2 - s * s) / (c * c), 0.0)
+    var[k - 1 :] = np.where(c > 0, v, np.nan)
+    # likewise a window with a single finite reading, which the numba kernels'
+    # per-window sums already give exactly 0
+    var[k - 1 :][c == 1] = 0.0
+    if flat is not None:
+        var[k - 1 :][flat] = 0.0
+    return var
+
+
+def _percentile(x, q):
+    """
+    q-th percentile of a NaN-free 1D array, same linear interpolation as np.percentile,
+    but selects the two bracketing order statistics with np.partition instead of sorting.
+    """
+    if x.size == 0:
+        return np.nan
+    pos = q / 100 * (x.size - 1)
+    lo = int(pos)
+    hi = min(lo + 1, x.size - 1)
+    part = np.partition(x, [lo, hi])
+    a, b = part[lo], part[hi]
+    t = pos - lo
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+def _variance_flags(var, threshold=None):
+    """var > threshold where var is finite; default threshold is the 95th percentile of var."""
+    finite = np.isfinite(var)
+    if threshold is None:
+        threshold = _percentile(var[finite], 95)
+    return finite & (var > threshold)
+
+
+def local_variance_mask(glucose, window_min=30, interval_min=5, threshold=None, *, finite=None, diff=None):
     """
     Rolling variance over window_min; flag windows where variance > threshold.
     Default threshold: 95th percentile of rolling variance (adaptive).
+    finite, diff: optional precomputed np.isfinite / np.diff of the normalized series.
     """
     arr = _as_array(glucose)
     n = arr.size
@@ -32,26 +148,25 @@ def local_variance_mask(glucose, window_min=30, interval_min=5, threshold=None):
         return np.zeros(n, dtype=bool)
 
     # rolling variance (skip NaN in window for robustness)
-    var = np.full(n, np.nan)
-    for i in range(k - 1, n):
-        w = arr[i - k + 1 : i + 1]
-        if np.any(np.isfinite(w)):
-            var[i] = np.nanvar(w)
-    if threshold is None:
-        threshold = np.nanpercentile(var[~np.isnan(var)], 95)
-    return np.where(np.isfinite(var), var > threshold, False)
+    if _numba is not None:
+        var = _numba._rolling_variance(arr, k)
+    else:
+        var = _rolling_nanvar(arr, k, finite, diff)
+    return _variance_flags(var, threshold)
 
 
-def jump_spike_mask(glucose, threshold_mgdL=20, interval_min=5):
+def jump_spike_mask(glucose, threshold_mgdL=20, interval_min=5, *, diff=None):
     """
     Consecutive readings with absolute change > threshold_mgdL within one interval.
+    diff: optional precomputed np.diff of the normalized series.
     """
     arr = _as_array(glucose)
-    diff = np.abs(np.diff(arr, prepend=arr[0]))
-    return diff > threshold_mgdL
+    out = np.zeros(arr.size, dtype=bool)
+    out[1:] = np.abs(_diff(arr, diff)) > threshold_mgdL
+    return out
 
 
-def jitter_mask(glucose, window_min=30, min_sign_changes=2, interval_min=5):
+def jitter_mask(glucose, window_min=30, min_sign_changes=2, interval_min=5, *, finite=None, diff=None):
     """
     Flag periods with too much small oscillation (jitter)—many direction reversals
     even when individual steps are small (e.g. 5–10 mg/dL up and down).
@@ -61,6 +176,8 @@ def jitter_mask(glucose, window_min=30, min_sign_changes=2, interval_min=5):
     first differences over a window: high reversal count = scatter / no pattern,
     low = dotted line. Entire window is marked unstable when sign changes
     >= min_sign_changes (default 2 in a 30-min window).
+
+    finite, diff: optional precomputed np.isfinite / np.diff of the normalized series.
     """
     arr = _as_array(glucose)
     n = arr.size
@@ -68,19 +185,18 @@ def jitter_mask(glucose, window_min=30, min_sign_changes=2, interval_min=5):
     if n < k:
         return np.zeros(n, dtype=bool)
 
-    out = np.zeros(n, dtype=bool)
-    for i in range(k - 1, n):
-        w = arr[i - k + 1 : i + 1]
-        if not np.all(np.isfinite(w)):
-            continue
-        d = np.diff(w)
-        if d.size < 2:
-            continue
-        # count direction reversals: sign change between consecutive diffs
-        sign_changes = np.sum((d[1:] * d[:-1]) < 0)
-        if sign_changes >= min_sign_changes:
-            out[i - k + 1 : i + 1] = True
-    return out
+    if _numba is not None:
+        return _numba._jitter(arr, k, min_sign_changes)
+
+    # direction reversals: sign change between consecutive diffs, once over the series;
+    # the window ending at i holds k - 2 of them
+    d = _diff(arr, diff)
+    reversal = (d[1:] * d[:-1]) < 0
+    sign_changes = _window_sums(reversal, k - 2)
+    n_finite = _window_sums(_finite_mask(arr, finite), k)
+    edge = np.zeros(n, dtype=bool)
+    edge[k - 1 :] = (n_finite == k) & (sign_changes >= min_sign_changes)
+    return _fill_windows(edge, k)
 
 
 def drift_window_mask(
@@ -90,6 +206,8 @@ def drift_window_mask(
     low_threshold_mgdL=70,
     low_duration_hr=8,
     interval_min=5,
+    finite=None,
+    diff=None,
 ):
     """
     Flag two patterns that may indicate sensor drift or governance blind spots
@@ -103,11 +221,14 @@ def drift_window_mask(
        low_threshold_mgdL (default 70) and stays there for more than 8 hours.
        Flagged as potential sensor drift (reading low), overnight compression low, or prolonged hypo.
 
-    Cost: monotonic check is O(n * window_length) with window = 24h of points;
-    low run is O(n). For 30 days @ 5 min, ~2.5e6 ops for monotonic, negligible for low run.
+    Cost: monotonic check is O(n) via running counts of rising/falling diffs per
+    window; low run is O(n).
+
+    finite, diff: optional precomputed np.isfinite / np.diff of the normalized series.
     """
     arr = _as_array(glucose)
     n = arr.size
+    finite = _finite_mask(arr, finite)
     points_per_hr = int(60 / interval_min)
     k_drift = max(2, int(drift_duration_hr * points_per_hr))   # e.g. 288 for 24 h @ 5 min
     k_low = max(2, int(low_duration_hr * points_per_hr))       # e.g. 96 for 8 h @ 5 min
@@ -115,34 +236,29 @@ def drift_window_mask(
     out = np.zeros(n, dtype=bool)
 
     # 1. Monotonic drift longer than drift_duration_hr
-    if n >= k_drift:
-        for i in range(k_drift - 1, n):
-            w = arr[i - k_drift + 1 : i + 1]
-            if not np.all(np.isfinite(w)):
-                continue
-            d = np.diff(w)
-            if (d >= 0).all() or (d <= 0).all():
-                out[i - k_drift + 1 : i + 1] = True
+    if n >= k_drift and _numba is not None:
+        out = _numba._monotonic_drift(arr, k_drift)
+    elif n >= k_drift:
+        # window ending at i is monotonic iff its k_drift - 1 diffs contain no
+        # decrease (min >= 0) or no increase (max <= 0), and every point is finite
+        d = _diff(arr, diff)
+        n_up = _window_sums(d > 0, k_drift - 1)
+        n_down = _window_sums(d < 0, k_drift - 1)
+        n_nonfinite = _window_sums(~finite, k_drift)
+        edge = np.zeros(n, dtype=bool)
+        edge[k_drift - 1 :] = (n_nonfinite == 0) & ((n_up == 0) | (n_down == 0))
+        out = _fill_windows(edge, k_drift)
 
     # 2. Below low_threshold_mgdL for longer than low_duration_hr
-    below = (arr < low_threshold_mgdL) & np.isfinite(arr)
-    if np.any(below):
-        run_start = None
-        for i in range(n + 1):
-            if i < n and below[i]:
-                if run_start is None:
-                    run_start = i
-            else:
-                if run_start is not None:
-                    run_len = i - run_start
-                    if run_len > k_low:
-                        out[run_start:i] = True
-                    run_start = None
+    below = (arr < low_threshold_mgdL) & finite
+    starts, ends = _runs(below)
+    keep = (ends - starts) > k_low
+    out |= _mark_spans(n, starts[keep], ends[keep])
 
     return out
 
 
-def dropout_flatline_mask(glucose, window_min=30, interval_min=5):
+def dropout_flatline_mask(glucose, window_min=30, interval_min=5, *, finite=None, diff=None):
     """
     Flag two patterns:
 
@@ -155,6 +271,8 @@ def dropout_flatline_mask(glucose, window_min=30, interval_min=5):
 
     Session-level context: max session length depends on device—use
     max_session_days(device_id) from src.session (G7 → 10.5 days, G6 → 10 days).
+
+    finite, diff: optional precomputed np.isfinite / np.diff of the normalized series.
     """
     arr = _as_array(glucose)
     n = arr.size
@@ -162,18 +280,22 @@ def dropout_flatline_mask(glucose, window_min=30, interval_min=5):
     # 1. Flatline: same value for window_min or longer
     out = np.zeros(n, dtype=bool)
     k = max(2, int(window_min / interval_min))
-    if n >= k:
-        for i in range(k - 1, n):
-            w = arr[i - k + 1 : i + 1]
-            if np.all(np.isfinite(w)) and np.nanmax(w) == np.nanmin(w):
-                out[i - k + 1 : i + 1] = True
+    if n >= k and _numba is not None:
+        out = _numba._flatline(arr, k)
+    elif n >= k:
+        # window ending at i is flat iff its k - 1 diffs are all exactly zero
+        # (a zero diff implies both neighbours are finite)
+        eq = _diff(arr, diff) == 0
+        edge = np.zeros(n, dtype=bool)
+        edge[k - 1 :] = _window_sums(eq, k - 1) == k - 1
+        out = _fill_windows(edge, k)
 
     # 2. Dropout: any NaN (sensor stopped or occasional missing value)
-    out = out | (~np.isfinite(arr))
+    out = out | ~_finite_mask(arr, finite)
     return out
 
 
-def long_nan_run_mask(glucose, dropout_min=30, prior_hr=1, interval_min=5):
+def long_nan_run_mask(glucose, dropout_min=30, prior_hr=1, interval_min=5, *, finite=None):
     """
     Separate mask: long NaN runs (>= dropout_min) and the prior_hr before each.
 
@@ -181,29 +303,20 @@ def long_nan_run_mask(glucose, dropout_min=30, prior_hr=1, interval_min=5):
     and the prior_hr (default 1 hour) before the run starts—the lead-up can be
     unreliable. Short NaN runs are not flagged by this mask (use dropout_flatline
     for any NaN). Combine with other masks via OR in instability_mask.
+
+    finite: optional precomputed np.isfinite of the normalized series.
     """
     arr = _as_array(glucose)
     n = arr.size
-    is_nan = ~np.isfinite(arr)
     k_dropout = max(1, int(dropout_min / interval_min))
     k_prior = max(0, int(prior_hr * 60 / interval_min))
 
-    out = np.zeros(n, dtype=bool)
-    run_start = None
-    for i in range(n + 1):
-        if i < n and is_nan[i]:
-            if run_start is None:
-                run_start = i
-        else:
-            if run_start is not None:
-                run_end = i
-                run_len = run_end - run_start
-                if run_len >= k_dropout:
-                    out[run_start:run_end] = True
-                    prior_start = max(0, run_start - k_prior)
-                    out[prior_start:run_start] = True
-                run_start = None
-    return out
+    if _numba is not None:
+        return _numba._long_nan_run(arr, k_dropout, k_prior)
+
+    starts, ends = _runs(~_finite_mask(arr, finite))
+    keep = (ends - starts) >= k_dropout
+    return _mark_spans(n, np.maximum(starts[keep] - k_prior, 0), ends[keep])
 
 
 def session_warmup_tail_mask(
@@ -316,6 +429,35 @@ def calibration_period_mask(
     return out
 
 
+def _fused_args(
+    *,
+    jump_threshold_mgdL,
+    jitter_window_min,
+    min_sign_changes,
+    drift_duration_hr,
+    low_threshold_mgdL,
+    low_duration_hr,
+    flatline_window_min,
+    dropout_min,
+    prior_hr,
+    interval_min,
+):
+    """Window lengths (points) and thresholds for _instability_fused, k_var first."""
+    points_per_hr = int(60 / interval_min)
+    return (
+        max(1, int(30 / interval_min)),
+        jump_threshold_mgdL,
+        max(3, int(jitter_window_min / interval_min)),
+        min_sign_changes,
+        max(2, int(drift_duration_hr * points_per_hr)),
+        low_threshold_mgdL,
+        max(2, int(low_duration_hr * points_per_hr)),
+        max(2, int(flatline_window_min / interval_min)),
+        max(1, int(dropout_min / interval_min)),
+        max(0, int(prior_hr * 60 / interval_min)),
+    )
+
+
 def instability_mask(
     glucose,
     *,
@@ -337,31 +479,152 @@ def instability_mask(
     for metric sensitivity (TIR/TBR/TAR masked vs unmasked).
     """
     arr = _as_array(glucose)
-    n = len(arr)
 
-    m1 = local_variance_mask(arr, window_min=30, interval_min=interval_min, threshold=variance_threshold)
-    m2 = jump_spike_mask(arr, threshold_mgdL=jump_threshold_mgdL, interval_min=interval_min)
-    m3 = jitter_mask(
-        arr,
-        window_min=jitter_window_min,
-        min_sign_changes=min_sign_changes,
-        interval_min=interval_min,
+    if _numba is not None:
+        args = _fused_args(
+            jump_threshold_mgdL=jump_threshold_mgdL,
+            jitter_window_min=jitter_window_min,
+            min_sign_changes=min_sign_changes,
+            drift_duration_hr=drift_duration_hr,
+            low_threshold_mgdL=low_threshold_mgdL,
+            low_duration_hr=low_duration_hr,
+            flatline_window_min=flatline_window_min,
+            dropout_min=dropout_min,
+            prior_hr=prior_hr,
+            interval_min=interval_min,
+        )
+        out, var = _numba._instability_fused(arr, *args)
+        if arr.size >= args[0]:
+            out |= _variance_flags(var, variance_threshold)
+        return out
+
+    finite = np.isfinite(arr)
+    diff = np.diff(arr)
+    # cheapest first; once every reading is flagged (e.g. a failed sensor session
+    # that is all dropout) the remaining masks cannot change the result
+    masks = (
+        lambda: dropout_flatline_mask(
+            arr,
+            window_min=flatline_window_min,
+            interval_min=interval_min,
+            finite=finite,
+            diff=diff,
+        ),
+        lambda: long_nan_run_mask(
+            arr,
+            dropout_min=dropout_min,
+            prior_hr=prior_hr,
+            interval_min=interval_min,
+            finite=finite,
+        ),
+        lambda: jump_spike_mask(arr, threshold_mgdL=jump_threshold_mgdL, interval_min=interval_min, diff=diff),
+        lambda: jitter_mask(
+            arr,
+            window_min=jitter_window_min,
+            min_sign_changes=min_sign_changes,
+            interval_min=interval_min,
+            finite=finite,
+            diff=diff,
+        ),
+        lambda: drift_window_mask(
+            arr,
+            drift_duration_hr=drift_duration_hr,
+            low_threshold_mgdL=low_threshold_mgdL,
+            low_duration_hr=low_duration_hr,
+            interval_min=interval_min,
+            finite=finite,
+            diff=diff,
+        ),
+        lambda: local_variance_mask(
+            arr,
+            window_min=30,
+            interval_min=interval_min,
+            threshold=variance_threshold,
+            finite=finite,
+            diff=diff,
+        ),
     )
-    m4 = drift_window_mask(
-        arr,
+
+    # every mask returns one flag per reading, so no length alignment is needed;
+    # OR in place into one buffer rather than allocating a temporary per operator
+    out = np.zeros(arr.size, dtype=bool)
+    for make_mask in masks:
+        out |= make_mask()
+        if out.all():
+            break
+    return out
+
+
+def instability_mask_batch(
+    glucose,
+    lengths=None,
+    *,
+    variance_threshold=None,
+    jump_threshold_mgdL=20,
+    jitter_window_min=30,
+    min_sign_changes=2,
+    drift_duration_hr=24,
+    low_threshold_mgdL=70,
+    low_duration_hr=8,
+    flatline_window_min=30,
+    dropout_min=30,
+    prior_hr=1,
+    interval_min=5,
+):
+    """
+    instability_mask for many sessions at once: one numeric glucose series per row
+    of a 2D array. With numba installed, rows are processed in parallel.
+
+    Parameters
+    ----------
+    glucose : array-like
+        2D float array (sessions x readings); ragged sessions padded to a common width.
+    lengths : array-like, optional
+        Number of readings in each row; padding past a row's length is not scanned
+        and is returned False. Default: every row uses the full width.
+    variance_threshold, ..., interval_min
+        As for instability_mask, applied to every row.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask with the same shape as glucose, True = unstable.
+    """
+    arr = _compact(np.ascontiguousarray(glucose, dtype=np.float64))
+    if arr.ndim != 2:
+        raise ValueError("Expected 2D glucose array (one series per row)")
+    n_rows, width = arr.shape
+    if lengths is None:
+        lengths = np.full(n_rows, width, dtype=np.int64)
+    else:
+        lengths = np.asarray(lengths, dtype=np.int64).reshape(-1)
+        if lengths.size != n_rows:
+            raise ValueError("lengths must have one entry per row")
+        if np.any((lengths < 0) | (lengths > width)):
+            raise ValueError("lengths must be between 0 and the row width")
+
+    params = dict(
+        jump_threshold_mgdL=jump_threshold_mgdL,
+        jitter_window_min=jitter_window_min,
+        min_sign_changes=min_sign_changes,
         drift_duration_hr=drift_duration_hr,
         low_threshold_mgdL=low_threshold_mgdL,
         low_duration_hr=low_duration_hr,
+        flatline_window_min=flatline_window_min,
+        dropout_min=dropout_min,
+        prior_hr=prior_hr,
         interval_min=interval_min,
     )
-    m5 = dropout_flatline_mask(arr, window_min=flatline_window_min, interval_min=interval_min)
-    m6 = long_nan_run_mask(arr, dropout_min=dropout_min, prior_hr=prior_hr, interval_min=interval_min)
-
-    # ensure same length (edge effects can differ by 1)
-    def pad(b, size):
-        if len(b) < size:
-            return np.resize(b, size)
-        return b[:size]
-
-    m1, m2, m3, m4, m5, m6 = (pad(m, n) for m in (m1, m2, m3, m4, m5, m6))
-    return (m1 | m2 | m3 | m4 | m5 | m6).astype(bool)
+    if _numba is None:
+        out = np.zeros((n_rows, width), dtype=bool)
+        for r, m in enumerate(lengths):
+            if m > 0:
+                out[r, :m] = instability_mask(arr[r, :m], variance_threshold=variance_threshold, **params)
+        return out
+
+    args = _fused_args(**params)
+    out, var = _numba._instability_fused_batch(arr, lengths, *args)
+    for r, m in enumerate(lengths):
+        if m >= args[0]:
+            out[r, :m] |= _variance_flags(var[r, :m], variance_threshold)
+    return out
@@ -11,24 +11,35 @@ import pandas as pd
 
 def _normalize_glucose(series):
     """Dexcom 'Low' -> 39 mg/dL; coerce to float; leave real NaNs as NaN for dropout masks."""
+    if (
+        isinstance(series, (np.ndarray, pd.Series))
+        and isinstance(series.dtype, np.dtype)
+        and series.dtype.kind in "fiu"
+    ):
+        # already numeric: no 'Low' strings to replace, skip the pandas round trip
+        return np.asarray(series)
     s = series if isinstance(series, pd.Series) else pd.Series(series)
     s = s.replace(["Low", "low"], 39)
     return pd.to_numeric(s, errors="coerce").values
 
 
 def _as_array(series):
-    series = _normalize_glucose(series)
-    arr = np.asarray(series, dtype=float)
+    arr = np.asarray(_normalize_glucose(series))
+    if arr.dtype != np.float64:
+        arr = arr.astype(np.float64)
     if arr.ndim != 1:
         raise ValueError("Expected 1D glucose series")
     return arr
 
 
 def _masked_series(glucose, mask):
-    """If mask is not None, exclude masked indices from numerator and denominator."""
+    """
+    If mask is not None, exclude masked indices from numerator and denominator.
+    Returns (arr, use); use is None when there is no mask, so callers skip the AND.
+    """
     arr = _as_array(glucose)
     if mask is None:
-        return arr, np.ones(arr.size, dtype=bool)
+        return arr, None
     m = np.asarray(mask, dtype=bool)
     if m.size != arr.size:
         raise ValueError("mask length must match glucose length")
@@ -36,41 +47,46 @@ def _masked_series(glucose, mask):
     return arr, use
 
 
+def _used_values(glucose, mask):
+    """Glucose values kept by the mask (all of them when mask is None, without a copy)."""
+    arr, use = _masked_series(glucose, mask)
+    return arr if use is None else arr[use]
+
+
 def compute_TIR(glucose, mask=None, low=70, high=180):
     """
     Time in range [low, high] as fraction of total (used) time.
     If mask is provided, excluded indices are omitted from both numerator and denominator.
     """
-    arr, use = _masked_series(glucose, mask)
-    if not np.any(use):
+    x = _used_values(glucose, mask)
+    if x.size == 0:
         return np.nan
-    valid = np.isfinite(arr) & use
-    if not np.any(valid):
+    if not np.any(np.isfinite(x)):
         return np.nan
-    in_range = (arr >= low) & (arr <= high) & use
-    return np.sum(in_range) / np.sum(use)
+    in_range = (x >= low) & (x <= high)
+    return np.count_nonzero(in_range) / x.size
 
 
 def compute_TBR(glucose, mask=None, low=70):
     """
     Time below range (< low) as fraction of total (used) time.
     """
-    arr, use = _masked_series(glucose, mask)
-    if not np.any(use):
+    x = _used_values(glucose, mask)
+    if x.size == 0:
         return np.nan
-    below = (arr < low) & use
-    return np.sum(below) / np.sum(use)
+    below = x < low
+    return np.count_nonzero(below) / x.size
 
 
 def compute_TAR(glucose, mask=None, high=180):
     """
     Time above range (> high) as fraction of total (used) time.
     """
-    arr, use = _masked_series(glucose, mask)
-    if not np.any(use):
+    x = _used_values(glucose, mask)
+    if x.size == 0:
         return np.nan
-    above = (arr > high) & use
-    return np.sum(above) / np.sum(use)
+    above = x > high
+    return np.count_nonzero(above) / x.size
 
 
 def compute_GMI(glucose, mask=None):
@@ -79,23 +95,42 @@ def compute_GMI(glucose, mask=None):
     Formula: GMI = 3.31 + 0.02392 × mean_glucose (Bergenstal et al.).
     If mask is provided, excluded indices are omitted; mean is over used, finite values only.
     """
-    arr, use = _masked_series(glucose, mask)
-    valid = np.isfinite(arr) & use
-    if not np.any(valid):
+    x = _used_values(glucose, mask)
+    valid = x[np.isfinite(x)]
+    if valid.size == 0:
         return np.nan
-    mean_glucose = float(np.mean(arr[valid]))
+    mean_glucose = float(np.mean(valid))
     return 3.31 + 0.02392 * mean_glucose
 
 
+def compute_all_metrics(glucose, mask=None, low=70, high=180):
+    """
+    TIR, TBR, TAR and GMI in one call, sharing normalization and masking.
+    Same values as compute_TIR/TBR/TAR/GMI with the same arguments.
+    Returns a dict with keys: TIR, TBR, TAR, GMI.
+    """
+    x = _used_values(glucose, mask)
+    if x.size == 0:
+        return {"TIR": np.nan, "TBR": np.nan, "TAR": np.nan, "GMI": np.nan}
+    valid = x[np.isfinite(x)]
+    n_used = x.size
+    tbr = np.count_nonzero(x < low) / n_used
+    tar = np.count_nonzero(x > high) / n_used
+    if valid.size == 0:
+        return {"TIR": np.nan, "TBR": tbr, "TAR": tar, "GMI": np.nan}
+    tir = np.count_nonzero((valid >= low) & (valid <= high)) / n_used
+    return {"TIR": tir, "TBR": tbr, "TAR": tar, "GMI": 3.31 + 0.02392 * float(np.mean(valid))}
+
+
 def compute_summary_metrics(glucose, mask=None):
     """
     Summary statistics over used, finite glucose values: mean, SD, CV, median, min, max.
     If mask is provided, excluded indices are omitted. CV = SD/mean (ratio); NaN if mean is 0.
     Returns a dict with keys: mean, sd, cv, median, min, max.
     """
-    arr, use = _masked_series(glucose, mask)
-    valid = np.isfinite(arr) & use
-    if not np.any(valid):
+    x = _used_values(glucose, mask)
+    x = x[np.isfinite(x)]
+    if x.size == 0:
         return {
             "mean": np.nan,
             "sd": np.nan,
@@ -104,7 +139,6 @@ def compute_summary_metrics(glucose, mask=None):
             "min": np.nan,
             "max": np.nan,
         }
-    x = arr[valid]
     mean = float(np.mean(x))
     sd = float(np.std(x, ddof=1))
     cv = sd / mean if mean != 0 else np.nan
@@ -3,9 +3,11 @@ Session-level helpers: device-specific max session length for early-failure chec
 Use with CGM session ID when grouping; reading-level masks are in instability.py.
 """
 
+from functools import lru_cache
 from typing import Optional
 
 
+@lru_cache(maxsize=256)
 def max_session_days(device_id: Optional[str]) -> Optional[float]:
     """
     Maximum expected session length in days for the given source device ID.
@@ -15,12 +17,15 @@ def max_session_days(device_id: Optional[str]) -> Optional[float]:
     - Otherwise → None (unknown device).
 
     Use when flagging sessions that ended before max (e.g. potential failure).
+    Results are cached per device_id (str and None are immutable, so cached entries
+    cannot go stale); device_id must be hashable.
     """
     if device_id is None:
         return None
-    s = str(device_id).upper()
-    if "G7" in s:
+    s = device_id if isinstance(device_id, str) else str(device_id)
+    # case-insensitive match without allocating an upper-cased copy
+    if "G7" in s or "g7" in s:
         return 10.5
-    if "G6" in s:
+    if "G6" in s or "g6" in s:
         return 10.0
     return None
@@ -1,5 +1,5 @@
 """
-Unit tests for instability mask heuristics.
+Unit tests for instability mask heuristics and glycemic metrics.
 
 Uses in-code synthetic fixtures only (no external CSV). Run from repo root with:
   python -m unittest src.tests
@@ -8,9 +8,13 @@ or, with pytest installed:
 """
 
 import unittest
+from unittest import mock
+
 import numpy as np
 import pandas as pd
 
+from . import instability
+from .metrics import compute_TIR, compute_TBR, compute_TAR, compute_GMI, compute_all_metrics
 from .instability import (
     local_variance_mask,
     jump_spike_mask,
@@ -21,6 +25,9 @@ from .instability import (
     session_warmup_tail_mask,
     calibration_period_mask,
     instability_mask,
+    instability_mask_batch,
+    _percentile,
+    _rolling_nanvar,
 )
 
 
@@ -51,6 +58,47 @@ class TestLocalVarianceMask(unittest.TestCase):
         m = local_variance_mask(g, window_min=30, interval_min=5, threshold=100.0)
         self.assertTrue(np.any(m), "at least one high-variance window should be flagged")
 
+    def test_rolling_variance_matches_nanvar(self):
+        g = _glucose(100, 104, np.nan, 97, 110, 108, 108, np.nan, np.nan, 120, 95, 101)
+        k = 3
+        expected = np.full(g.size, np.nan)
+        for i in range(k - 1, g.size):
+            w = g[i - k + 1 : i + 1]
+            if np.any(np.isfinite(w)):
+                expected[i] = np.nanvar(w)
+        np.testing.assert_allclose(_rolling_nanvar(g, k), expected)
+
+    def test_flat_windows_not_flagged(self):
+        # flat stretches must have exactly zero variance, or they cross the threshold
+        rng = np.random.default_rng(2)
+        g = np.full(3000, 100.0)
+        g[10:40] = np.round(rng.normal(150, 60, 30))
+        g[100:130] = np.round(rng.normal(150, 60, 30))
+        m = local_variance_mask(g, window_min=30, interval_min=5)
+        expected = np.zeros(g.size, dtype=bool)
+        var = _rolling_nanvar(g, 6)
+        expected[np.isfinite(var)] = var[np.isfinite(var)] > _percentile(var[np.isfinite(var)], 95)
+        np.testing.assert_array_equal(m, expected)
+        self.assertFalse(np.any(m[200:]), "flat stretch flagged as high variance")
+
+    def test_flat_non_integer_windows_not_flagged(self):
+        # running sums of 5.6 leave rounding residue; flat windows must still be exactly 0
+        g = np.full(2000, 5.6)
+        g[500:530] = np.round(np.random.default_rng(49).uniform(3, 15, 30), 1)
+        var = _rolling_nanvar(g, 6)
+        self.assertTrue(np.all(var[5:500] == 0.0) and np.all(var[540:] == 0.0))
+        with mock.patch.object(instability, "_numba", None):
+            m = local_variance_mask(g, window_min=30, interval_min=5)
+        self.assertFalse(np.any(m[:500]) or np.any(m[540:]), "flat stretch flagged as high variance")
+        if instability._numba is not None:
+            np.testing.assert_array_equal(local_variance_mask(g, window_min=30, interval_min=5), m)
+
+    def test_percentile_matches_numpy(self):
+        x = np.array([4.0, 1.5, 9.0, 9.0, 2.25, 7.0, 3.0, 0.5, 6.0, 5.5, 8.0])
+        for q in (0, 37.5, 95, 100):
+            self.assertEqual(_percentile(x, q), np.percentile(x, q))
+        self.assertTrue(np.isnan(_percentile(np.array([]), 95)))
+
 
 # ---- jump_spike_mask ----
 
@@ -121,6 +169,18 @@ class TestDriftWindowMask(unittest.TestCase):
         )
         self.assertTrue(np.any(m), "long monotonic segment should be flagged")
 
+    def test_reversal_or_nan_breaks_monotonic_drift(self):
+        # 6-point drift window; each 6-point stretch contains a reversal or a NaN
+        g = _glucose(80, 85, 90, 95, 93, 100, 105, 110, np.nan, 120, 125)
+        m = drift_window_mask(
+            g,
+            drift_duration_hr=0.5,
+            low_threshold_mgdL=70,
+            low_duration_hr=8,
+            interval_min=5,
+        )
+        self.assertFalse(np.any(m))
+
     def test_long_low_run_flagged(self):
         # 10 points at 65 mg/dL with 5-min interval = 45 min; need 8 hr = 96 points for default
         # Use low_duration_hr small so 10 points counts
@@ -149,6 +209,12 @@ class TestDropoutFlatlineMask(unittest.TestCase):
         m = dropout_flatline_mask(g, window_min=30, interval_min=5)
         self.assertTrue(np.any(m), "constant window should be flagged as flatline")
 
+    def test_flatline_marks_whole_run_only(self):
+        g = _glucose(90, 95, 100, 100, 100, 100, 100, 100, 100, 104, 110)
+        m = dropout_flatline_mask(g, window_min=30, interval_min=5)
+        expected = np.array([False, False] + [True] * 7 + [False, False])
+        np.testing.assert_array_equal(m, expected)
+
     def test_input_with_nan_normalized_then_no_dropout_flags(self):
         # _as_array normalizes glucose (NaN -> 39), so after normalization there are
         # no NaNs; the dropout branch is not exercised for array input.
@@ -178,6 +244,13 @@ class TestLongNanRunMask(unittest.TestCase):
         m = long_nan_run_mask(g, dropout_min=30, prior_hr=1, interval_min=5)
         self.assertFalse(np.any(m), "short NaN run is not flagged by long_nan_run_mask")
 
+    def test_long_nan_run_and_prior_flagged(self):
+        # 6 NaNs = 30 min; prior_hr=0.25 -> 3 points before the run
+        g = np.concatenate([np.full(5, 100.0), np.full(6, np.nan), np.full(3, 100.0)])
+        m = long_nan_run_mask(g, dropout_min=30, prior_hr=0.25, interval_min=5)
+        expected = np.array([False, False] + [True] * 9 + [False] * 3)
+        np.testing.assert_array_equal(m, expected)
+
 
 # ---- session_warmup_tail_mask ----
 
@@ -273,6 +346,153 @@ class TestInstabilityMask(unittest.TestCase):
         m = instability_mask(g)
         self.assertTrue(np.any(m), "large step should be flagged by combined mask")
 
+    def test_all_dropout_session_fully_flagged(self):
+        g = np.full(20, np.nan)
+        for numba_mod in (instability._numba, None):
+            with mock.patch.object(instability, "_numba", numba_mod):
+                np.testing.assert_array_equal(instability_mask(g), True)
+
+    def test_component_masks_align_with_input(self):
+        # lengths around each window size; a short mask must never be tiled to fit
+        for n in (1, 2, 5, 6, 7, 13):
+            g = np.where(np.arange(n) % 2 == 0, 100.0, 125.0)
+            for fn in (
+                local_variance_mask,
+                jump_spike_mask,
+                jitter_mask,
+                drift_window_mask,
+                dropout_flatline_mask,
+                long_nan_run_mask,
+                instability_mask,
+            ):
+                with self.subTest(mask=fn.__name__, n=n):
+                    self.assertEqual(fn(g).shape, (n,))
+
+
+class TestInstabilityMaskBatch(unittest.TestCase):
+    def test_rows_match_instability_mask(self):
+        rows = np.array([
+            [100, 102, 130, 132, 131, 131, 131, 131, 131, 131, 120, 118],
+            [100, 110, 100, 110, 100, 110, 100, np.nan, np.nan, 0, 0, 0],
+        ])
+        lengths = [12, 7]
+        m = instability_mask_batch(rows, lengths)
+        self.assertEqual(m.shape, rows.shape)
+        self.assertEqual(m.dtype, bool)
+        for row, n, flags in zip(rows, lengths, m):
+            np.testing.assert_array_equal(flags[:n], instability_mask(row[:n]))
+            self.assertFalse(np.any(flags[n:]), "padding past a row's length is not flagged")
+
+    def test_bad_lengths_raise(self):
+        rows = np.full((2, 6), 100.0)
+        with self.assertRaises(ValueError):
+            instability_mask_batch(rows, [6])
+        with self.assertRaises(ValueError):
+            instability_mask_batch(rows, [6, 7])
+
+
+# ---- compute_all_metrics ----
+
+class TestComputeAllMetrics(unittest.TestCase):
+    def test_matches_individual_metrics(self):
+        g = pd.Series(["Low", 65, 70, 120, 180, 181, 250, np.nan, 95, 140])
+        for mask in (None, np.array([False, True] * 5)):
+            with self.subTest(masked=mask is not None):
+                m = compute_all_metrics(g, mask=mask)
+                self.assertEqual(m["TIR"], compute_TIR(g, mask=mask))
+                self.assertEqual(m["TBR"], compute_TBR(g, mask=mask))
+                self.assertEqual(m["TAR"], compute_TAR(g, mask=mask))
+                self.assertEqual(m["GMI"], compute_GMI(g, mask=mask))
+
+    def test_all_masked_is_nan(self):
+        g = _glucose(100, 200, 60)
+        m = compute_all_metrics(g, mask=np.ones(3, dtype=bool))
+        self.assertTrue(all(np.isnan(v) for v in m.values()))
+
+
+class TestInputDtype(unittest.TestCase):
+    def test_non_integer_readings_keep_float64(self):
+        # 5.6 and 5.6000001 are one float32; the flatline must still end before the last reading
+        g = [5.5, 5.6, 5.6, 5.6, 5.6, 5.6, 5.6, 5.6000001]
+        self.assertEqual(instability._as_array(g).dtype, np.float64)
+        m = dropout_flatline_mask(g, window_min=30, interval_min=5)
+        np.testing.assert_array_equal(m, [False, True, True, True, True, True, True, False])
+
+    def test_integer_readings_use_float32(self):
+        g = pd.Series([100, "Low", np.nan, 250])
+        arr = instability._as_array(g)
+        self.assertEqual(arr.dtype, np.float32)
+        np.testing.assert_array_equal(arr, [100, 39, np.nan, 250])
+
+
+# ---- numba kernels vs NumPy fallback ----
+
+@unittest.skipIf(instability._numba is None, "numba not installed")
+class TestNumbaKernelsMatchNumpy(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # longer than one rolling-variance chunk plus the window
+        g = np.round(120 + np.cumsum(rng.normal(0, 6, 9000)))
+        g[100:108] = g[100]          # flatline
+        g[300:310] = np.nan          # long dropout
+        g[500] = np.nan              # single dropout
+        g[700:1000] = np.linspace(90, 240, 300)  # monotonic drift
+        g[1200:1350] = 60            # long low run
+        g[5000:5300] = 100           # flat stretch inside a later chunk
+        self.g = g
+
+    def _both(self, fn, g=None, **kwargs):
+        g = self.g if g is None else g
+        fast = fn(g, **kwargs)
+        with mock.patch.object(instability, "_numba", None):
+            slow = fn(g, **kwargs)
+        return fast, slow
+
+    def test_rolling_variance_matches_across_chunks(self):
+        # longer than one prange chunk plus the window, so later chunks are exercised
+        rng = np.random.default_rng(11)
+        k = 6
+        n = 3 * instability._numba._VAR_CHUNK + 17
+        g = np.round(120 + np.cumsum(rng.normal(0, 6, n)))
+        g[rng.integers(0, n, 200)] = np.nan
+        expected = _rolling_nanvar(g, k)
+        np.testing.assert_array_equal(instability._numba._rolling_variance(g, k), expected)
+
+    def test_rolling_variance_non_integer(self):
+        # running sums are no longer exact; flat windows must still agree at exactly 0
+        k = 6
+        g = self.g / 18.0
+        expected = _rolling_nanvar(g, k)
+        got = instability._numba._rolling_variance(g, k)
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(got == 0, expected == 0)
+
+    def test_masks_match(self):
+        cases = [
+            (local_variance_mask, {}),
+            (jitter_mask, {}),
+            (drift_window_mask, {"drift_duration_hr": 2, "low_duration_hr": 1}),
+            (dropout_flatline_mask, {}),
+            (long_nan_run_mask, {}),
+            (instability_mask, {"drift_duration_hr": 2, "low_duration_hr": 1}),
+        ]
+        for fn, kwargs in cases:
+            with self.subTest(mask=fn.__name__):
+                fast, slow = self._both(fn, **kwargs)
+                np.testing.assert_array_equal(fast, slow)
+
+    def test_masks_match_non_integer(self):
+        # mmol/L-style readings: every variance implementation must agree off the integers
+        g = self.g / 18.0
+        cases = [
+            (local_variance_mask, {}),
+            (instability_mask, {"jump_threshold_mgdL": 1, "low_threshold_mgdL": 4}),
+        ]
+        for fn, kwargs in cases:
+            with self.subTest(mask=fn.__name__):
+                fast, slow = self._both(fn, g, **kwargs)
+                np.testing.assert_array_equal(fast, slow)
+
 
 if __name__ == "__main__":
     unittest.main()